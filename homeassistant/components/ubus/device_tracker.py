@@ -1,9 +1,10 @@
 """Support for OpenWRT (ubus) routers."""
-import json
+import asyncio
 import logging
 import re
 
-import requests
+import aiohttp
+import async_timeout
 import voluptuous as vol
 
 from homeassistant.components.device_tracker import (
@@ -11,7 +12,12 @@ from homeassistant.components.device_tracker import (
     PLATFORM_SCHEMA,
     DeviceScanner,
 )
-from homeassistant.const import CONF_HOST, CONF_PASSWORD, CONF_USERNAME
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_PASSWORD,
+    CONF_USERNAME,
+    EVENT_HOMEASSISTANT_CLOSE,
+)
 from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
 
@@ -33,36 +39,31 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
 )
 
 
-def get_scanner(hass, config):
+async def async_get_scanner(hass, config):
     """Validate the configuration and return an ubus scanner."""
+    # A small dedicated pool keeps the connection to the router alive
+    # between polls instead of reconnecting on every scan.
+    websession = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=75)
+    )
+
+    async def _async_close_websession(event):
+        """Close the router session."""
+        await websession.close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_websession)
+
     dhcp_sw = config[DOMAIN][CONF_DHCP_SOFTWARE]
     if dhcp_sw == "dnsmasq":
-        scanner = DnsmasqUbusDeviceScanner(config[DOMAIN])
+        scanner = DnsmasqUbusDeviceScanner(config[DOMAIN], websession)
     elif dhcp_sw == "odhcpd":
-        scanner = OdhcpdUbusDeviceScanner(config[DOMAIN])
+        scanner = OdhcpdUbusDeviceScanner(config[DOMAIN], websession)
     else:
-        scanner = UbusDeviceScanner(config[DOMAIN])
+        scanner = UbusDeviceScanner(config[DOMAIN], websession)
 
-    return scanner if scanner.success_init else None
-
-
-def _refresh_on_access_denied(func):
-    """If remove rebooted, it lost our session so rebuild one and try again."""
-
-    def decorator(self, *args, **kwargs):
-        """Wrap the function to refresh session_id on PermissionError."""
-        try:
-            return func(self, *args, **kwargs)
-        except PermissionError:
-            _LOGGER.warning(
-                "Invalid session detected."
-                " Trying to refresh session_id and re-run RPC"
-            )
-            self.session_id = _get_session_id(self.url, self.username, self.password)
-
-            return func(self, *args, **kwargs)
-
-    return decorator
+    # Logging in is deferred to the first scan so startup does not wait
+    # for the router.
+    return scanner
 
 
 class UbusDeviceScanner(DeviceScanner):
@@ -72,7 +73,7 @@ class UbusDeviceScanner(DeviceScanner):
     Adapted from Tomato scanner.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, websession):
         """Initialize the scanner."""
         host = config[CONF_HOST]
         self.username = config[CONF_USERNAME]
@@ -82,78 +83,161 @@ class UbusDeviceScanner(DeviceScanner):
         self.last_results = {}
         self.url = f"http://{host}/ubus"
 
-        self.session_id = _get_session_id(self.url, self.username, self.password)
+        self.websession = websession
+        self.session_id = None
+        self._login_lock = asyncio.Lock()
         self.hostapd = []
         self.mac2name = None
-        self.success_init = self.session_id is not None
+        self._login_failed = False
+
+    async def _async_login(self):
+        """Log in to the router, return True on success."""
+        self.session_id = await _async_get_session_id(
+            self.websession, self.url, self.username, self.password
+        )
+        if self.session_id is None:
+            # Only report the first failure, the router may stay down a while
+            if not self._login_failed:
+                _LOGGER.error("Unable to log in to %s", self.url)
+            self._login_failed = True
+            return False
+
+        if self._login_failed:
+            _LOGGER.info("Logged in to %s again", self.url)
+        self._login_failed = False
+        return True
+
+    async def _async_update_hostapd(self):
+        """Discover the access points of the router."""
+        hostapd = await self._async_req(_async_req_json_rpc, "list", "hostapd.*", "")
+        if hostapd is not None:
+            self.hostapd = list(hostapd.keys())
+
+    async def _async_req(self, request, *args, **kwargs):
+        """Run a JSON RPC request with the cached session.
 
-    def scan_devices(self):
+        If the router rebooted it lost our session, so log in again once
+        and re-run the request.
+        """
+        session_id = self.session_id
+        try:
+            return await request(self.websession, self.url, session_id, *args, **kwargs)
+        except PermissionError:
+            async with self._login_lock:
+                # A concurrent request may have logged in again while we waited
+                if self.session_id == session_id:
+                    _LOGGER.warning(
+                        "Invalid session detected."
+                        " Trying to refresh session_id and re-run RPC"
+                    )
+                    self.session_id = await _async_get_session_id(
+                        self.websession, self.url, self.username, self.password
+                    )
+
+            return await request(
+                self.websession, self.url, self.session_id, *args, **kwargs
+            )
+
+    async def async_scan_devices(self):
         """Scan for new devices and return a list with found device IDs."""
-        self._update_info()
-        return self.last_results
+        await self._async_update_info()
+        return list(self.last_results)
 
-    def _generate_mac2name(self):
+    async def _async_generate_mac2name(self):
         """Return empty MAC to name dict. Overridden if DHCP server is set."""
         self.mac2name = dict()
 
-    @_refresh_on_access_denied
-    def get_device_name(self, device):
+    async def _async_refresh_mac2name(self):
+        """Refresh the MAC to name dict, keeping the scan alive on errors."""
+        try:
+            await self._async_generate_mac2name()
+        except (HomeAssistantError, PermissionError) as err:
+            _LOGGER.warning("Unable to fetch the DHCP leases: %s", err)
+
+    async def async_get_device_name(self, device):
         """Return the name of the given device or None if we don't know."""
-        if self.mac2name is None:
-            self._generate_mac2name()
-        if self.mac2name is None:
-            # Generation of mac2name dictionary failed
-            return None
-        name = self.mac2name.get(device.upper(), None)
-        return name
+        return self.last_results.get(device)
 
-    @_refresh_on_access_denied
-    def _update_info(self):
-        """Ensure the information from the router is up to date.
+    async def _async_update_info(self):
+        """Refresh the snapshot of connected devices and their names.
 
         Returns boolean if scanning successful.
         """
-        if not self.success_init:
+        if self.session_id is None and not await self._async_login():
+            return False
+
+        # hostapd may not be running yet, e.g. right after the router booted
+        if not self.hostapd:
+            await self._async_update_hostapd()
+
+        if self.mac2name is None:
+            # No names known yet, fetch the clients and the leases at once
+            clients, _ = await asyncio.gather(
+                self._async_get_clients(), self._async_refresh_mac2name()
+            )
+        else:
+            clients = await self._async_get_clients()
+            # Names are only asked for new devices, skip the leases otherwise
+            if clients and any(
+                mac not in self.last_results and mac.upper() not in self.mac2name
+                for mac in clients
+            ):
+                await self._async_refresh_mac2name()
+
+        if clients is None:
+            self.last_results = {}
             return False
 
+        mac2name = self.mac2name or {}
+        self.last_results = {mac: mac2name.get(mac.upper()) for mac in clients}
+        return True
+
+    async def _async_get_clients(self):
+        """Return the authorized clients of every access point."""
         _LOGGER.info("Checking hostapd")
 
         if not self.hostapd:
-            hostapd = _req_json_rpc(self.url, self.session_id, "list", "hostapd.*", "")
-            self.hostapd.extend(hostapd.keys())
-
-        self.last_results = []
-        results = 0
-        # for each access point
-        for hostapd in self.hostapd:
-            result = _req_json_rpc(
-                self.url, self.session_id, "call", hostapd, "get_clients"
-            )
+            return None
 
-            if result:
-                results = results + 1
-                # Check for each device is authorized (valid wpa key)
-                for key in result["clients"].keys():
-                    device = result["clients"][key]
-                    if device["authorized"]:
-                        self.last_results.append(key)
+        # Query every access point in a single batched request
+        results = await self._async_req(
+            _async_req_json_rpc_batch,
+            [(hostapd, "get_clients", {}) for hostapd in self.hostapd],
+        )
+        if results is None:
+            return None
+
+        results = [result for result in results if result]
+        if not results:
+            # None of the known access points answered, look them up again
+            self.hostapd = []
+            return None
+
+        clients = []
+        for result in results:
+            # Check for each device is authorized (valid wpa key)
+            for key in result["clients"].keys():
+                device = result["clients"][key]
+                if device["authorized"]:
+                    clients.append(key)
 
-        return bool(results)
+        return clients
 
 
 class DnsmasqUbusDeviceScanner(UbusDeviceScanner):
     """Implement the Ubus device scanning for the dnsmasq DHCP server."""
 
-    def __init__(self, config):
+    def __init__(self, config, websession):
         """Initialize the scanner."""
-        super().__init__(config)
+        super().__init__(config, websession)
         self.leasefile = None
+        self.leasefile_mtime = None
+        self.leasefile_stat = True
 
-    def _generate_mac2name(self):
+    async def _async_generate_mac2name(self):
         if self.leasefile is None:
-            result = _req_json_rpc(
-                self.url,
-                self.session_id,
+            result = await self._async_req(
+                _async_req_json_rpc,
                 "call",
                 "uci",
                 "get",
@@ -166,24 +250,62 @@ class DnsmasqUbusDeviceScanner(UbusDeviceScanner):
             else:
                 return
 
-        result = _req_json_rpc(
-            self.url, self.session_id, "call", "file", "read", path=self.leasefile
+        # The lease file rarely changes, only re-read it when it did
+        mtime = None
+        stat_denied = False
+        session_id = self.session_id
+        if self.leasefile_stat:
+            # Not through _async_req: a denied stat is usually the rpcd ACL
+            # of the user, not an expired session
+            try:
+                stat = await _async_req_json_rpc(
+                    self.websession,
+                    self.url,
+                    session_id,
+                    "call",
+                    "file",
+                    "stat",
+                    path=self.leasefile,
+                )
+            except PermissionError:
+                stat_denied = True
+            else:
+                mtime = stat.get("mtime") if stat else None
+        if (
+            mtime is not None
+            and mtime == self.leasefile_mtime
+            and self.mac2name is not None
+        ):
+            return
+
+        result = await self._async_req(
+            _async_req_json_rpc, "call", "file", "read", path=self.leasefile
         )
+        if stat_denied and result and self.session_id == session_id:
+            # The read worked with the same session, so only stat is denied
+            _LOGGER.debug("Not allowed to stat %s", self.leasefile)
+            self.leasefile_stat = False
         if result:
-            self.mac2name = dict()
+            self.leasefile_mtime = mtime
+            # Lease lines are "<expiry> <mac> <ip> <hostname> <client-id>"
+            mac2name = {}
             for line in result["data"].splitlines():
-                hosts = line.split(" ")
-                self.mac2name[hosts[1].upper()] = hosts[3]
+                hosts = line.split(" ", 4)
+                if len(hosts) >= 4:
+                    mac2name[hosts[1].upper()] = hosts[3]
+            self.mac2name = mac2name
         else:
-            # Error, handled in the _req_json_rpc
+            # Error, handled in the _async_req_json_rpc
             return
 
 
 class OdhcpdUbusDeviceScanner(UbusDeviceScanner):
     """Implement the Ubus device scanning for the odhcp DHCP server."""
 
-    def _generate_mac2name(self):
-        result = _req_json_rpc(self.url, self.session_id, "call", "dhcp", "ipv4leases")
+    async def _async_generate_mac2name(self):
+        result = await self._async_req(
+            _async_req_json_rpc, "call", "dhcp", "ipv4leases"
+        )
         if result:
             self.mac2name = dict()
             for device in result["device"].values():
@@ -193,49 +315,99 @@ class OdhcpdUbusDeviceScanner(UbusDeviceScanner):
                     mac = ":".join(mac[i : i + 2] for i in range(0, len(mac), 2))
                     self.mac2name[mac.upper()] = lease["hostname"]
         else:
-            # Error, handled in the _req_json_rpc
+            # Error, handled in the _async_req_json_rpc
             return
 
 
-def _req_json_rpc(url, session_id, rpcmethod, subsystem, method, **params):
+async def _async_post_json_rpc(websession, url, data):
+    """Post a JSON RPC payload and return the decoded response."""
+    try:
+        with async_timeout.timeout(5):
+            async with websession.post(url, json=data) as res:
+                if res.status != 200:
+                    return None
+                return await res.json()
+
+    except (asyncio.TimeoutError, aiohttp.ClientError):
+        return None
+
+
+def _check_json_rpc_error(response):
+    """Raise if a JSON RPC response carries an error."""
+    if "error" in response:
+        if (
+            "message" in response["error"]
+            and response["error"]["message"] == "Access denied"
+        ):
+            raise PermissionError(response["error"]["message"])
+        raise HomeAssistantError(response["error"]["message"])
+
+
+async def _async_req_json_rpc(
+    websession, url, session_id, rpcmethod, subsystem, method, **params
+):
     """Perform one JSON RPC operation."""
-    data = json.dumps(
+    data = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": rpcmethod,
+        "params": [session_id, subsystem, method, params],
+    }
+
+    response = await _async_post_json_rpc(websession, url, data)
+    if response is None:
+        return
+
+    _check_json_rpc_error(response)
+
+    if rpcmethod == "call":
+        try:
+            return response["result"][1]
+        except IndexError:
+            return
+    else:
+        return response["result"]
+
+
+async def _async_req_json_rpc_batch(websession, url, session_id, calls):
+    """Perform several JSON RPC call operations in one request.
+
+    Returns the results in the order of the given (subsystem, method, params)
+    calls, with None for calls that returned no data.
+    """
+    data = [
         {
             "jsonrpc": "2.0",
-            "id": 1,
-            "method": rpcmethod,
+            "id": idx,
+            "method": "call",
             "params": [session_id, subsystem, method, params],
         }
-    )
+        for idx, (subsystem, method, params) in enumerate(calls)
+    ]
 
-    try:
-        res = requests.post(url, data=data, timeout=5)
+    response = await _async_post_json_rpc(websession, url, data)
+    if response is None:
+        return None
 
-    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-        return
+    # A batch containing a single call may be answered with a bare object
+    if isinstance(response, dict):
+        response = [response]
 
-    if res.status_code == 200:
-        response = res.json()
-        if "error" in response:
-            if (
-                "message" in response["error"]
-                and response["error"]["message"] == "Access denied"
-            ):
-                raise PermissionError(response["error"]["message"])
-            raise HomeAssistantError(response["error"]["message"])
+    results = [None] * len(calls)
+    for reply in response:
+        _check_json_rpc_error(reply)
+        try:
+            results[reply["id"]] = reply["result"][1]
+        except (IndexError, KeyError, TypeError):
+            continue
 
-        if rpcmethod == "call":
-            try:
-                return response["result"][1]
-            except IndexError:
-                return
-        else:
-            return response["result"]
+    return results
 
 
-def _get_session_id(url, username, password):
+async def _async_get_session_id(websession, url, username, password):
     """Get the authentication token for the given host+username+password."""
-    res = _req_json_rpc(
+    res = await _async_req_json_rpc(
+        websession,
         url,
         "00000000000000000000000000000000",
         "call",
@@ -244,4 +416,6 @@ def _get_session_id(url, username, password):
         username=username,
         password=password,
     )
+    if res is None:
+        return None
     return res["ubus_rpc_session"]
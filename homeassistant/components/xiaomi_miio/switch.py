@@ -2,6 +2,7 @@
 import asyncio
 from functools import partial
 import logging
+from operator import attrgetter
 
 from miio import (  # pylint: disable=import-error
     AirConditioningCompanionV3,
@@ -433,6 +434,8 @@ class ChuangMiPlugSwitch(XiaomiPlugGenericSwitch):
 
         super().__init__(name, plug, model, unique_id)
         self._channel_usb = channel_usb
+        # Resolve the status field of this channel once, not on every update
+        self._get_channel_state = attrgetter("usb_power" if channel_usb else "is_on")
 
         if self._model == MODEL_PLUG_V3:
             self._device_features = FEATURE_FLAGS_PLUG_V3
@@ -482,10 +485,7 @@ class ChuangMiPlugSwitch(XiaomiPlugGenericSwitch):
             _LOGGER.debug("Got new state: %s", state)
 
             self._available = True
-            if self._channel_usb:
-                self._state = state.usb_power
-            else:
-                self._state = state.is_on
+            self._state = self._get_channel_state(state)
 
             self._state_attrs[ATTR_TEMPERATURE] = state.temperature
 
@@ -61,6 +61,13 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
 )
 
 FAN_SPEEDS = {"Silent": 38, "Standard": 60, "Medium": 77, "Turbo": 90, "Gentle": 105}
+FAN_SPEEDS_REVERSE = {value: key for key, value in FAN_SPEEDS.items()}
+FAN_SPEED_LIST = sorted(FAN_SPEEDS, key=FAN_SPEEDS.get)
+# Preset names and the string form of their values, resolved in one lookup
+FAN_SPEED_LOOKUP = {
+    **FAN_SPEEDS,
+    **{str(value): value for value in FAN_SPEEDS.values()},
+}
 
 ATTR_CLEAN_START = "clean_start"
 ATTR_CLEAN_STOP = "clean_stop"
@@ -113,22 +120,6 @@ SERVICE_SCHEMA_CLEAN_ZONE = VACUUM_SERVICE_SCHEMA.extend(
     }
 )
 
-SERVICE_SCHEMA_CLEAN_ZONE = VACUUM_SERVICE_SCHEMA.extend(
-    {
-        vol.Required(ATTR_ZONE_ARRAY): vol.All(
-            list,
-            [
-                vol.ExactSequence(
-                    [vol.Coerce(int), vol.Coerce(int), vol.Coerce(int), vol.Coerce(int)]
-                )
-            ],
-        ),
-        vol.Required(ATTR_ZONE_REPEATER): vol.All(
-            vol.Coerce(int), vol.Clamp(min=1, max=3)
-        ),
-    }
-)
-
 SERVICE_TO_METHOD = {
     SERVICE_START_REMOTE_CONTROL: {"method": "async_remote_control_start"},
     SERVICE_STOP_REMOTE_CONTROL: {"method": "async_remote_control_stop"},
@@ -213,10 +204,12 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
         else:
             target_vacuums = hass.data[DATA_KEY].values()
 
-        update_tasks = []
-        for vacuum in target_vacuums:
-            await getattr(vacuum, method["method"])(**params)
+        # Send the command to all targeted vacuums at once
+        await asyncio.gather(
+            *[getattr(vacuum, method["method"])(**params) for vacuum in target_vacuums]
+        )
 
+        update_tasks = []
         for vacuum in target_vacuums:
             update_coro = vacuum.async_update_ha_state(True)
             update_tasks.append(update_coro)
@@ -246,6 +239,9 @@ class MiroboVacuum(StateVacuumDevice):
         self.clean_history = None
         self.dnd_state = None
         self.last_clean = None
+        self._device_attrs = {}
+        self._status_attrs = {}
+        self._state_attrs = {}
 
     @property
     def name(self):
@@ -260,15 +256,14 @@ class MiroboVacuum(StateVacuumDevice):
             # We want to keep returning an error until it has been cleared.
             if self.vacuum_state.got_error:
                 return STATE_ERROR
-            try:
-                return STATE_CODE_TO_STATE[int(self.vacuum_state.state_code)]
-            except KeyError:
+            state = STATE_CODE_TO_STATE.get(int(self.vacuum_state.state_code))
+            if state is None:
                 _LOGGER.error(
                     "STATE not supported: %s, state_code: %s",
                     self.vacuum_state.state,
                     self.vacuum_state.state_code,
                 )
-                return None
+            return state
 
     @property
     def battery_level(self):
@@ -281,60 +276,60 @@ class MiroboVacuum(StateVacuumDevice):
         """Return the fan speed of the vacuum cleaner."""
         if self.vacuum_state is not None:
             speed = self.vacuum_state.fanspeed
-            if speed in FAN_SPEEDS.values():
-                return [key for key, value in FAN_SPEEDS.items() if value == speed][0]
-            return speed
+            return FAN_SPEEDS_REVERSE.get(speed, speed)
 
     @property
     def fan_speed_list(self):
         """Get the list of available fan speed steps of the vacuum cleaner."""
-        return list(sorted(FAN_SPEEDS.keys(), key=lambda s: FAN_SPEEDS[s]))
+        return FAN_SPEED_LIST
 
     @property
     def device_state_attributes(self):
         """Return the specific state attributes of this vacuum cleaner."""
-        attrs = {}
-        if self.vacuum_state is not None:
-            attrs.update(
-                {
-                    ATTR_DO_NOT_DISTURB: STATE_ON
-                    if self.dnd_state.enabled
-                    else STATE_OFF,
-                    ATTR_DO_NOT_DISTURB_START: str(self.dnd_state.start),
-                    ATTR_DO_NOT_DISTURB_END: str(self.dnd_state.end),
-                    # Not working --> 'Cleaning mode':
-                    #    STATE_ON if self.vacuum_state.in_cleaning else STATE_OFF,
-                    ATTR_CLEANING_TIME: int(
-                        self.vacuum_state.clean_time.total_seconds() / 60
-                    ),
-                    ATTR_CLEANED_AREA: int(self.vacuum_state.clean_area),
-                    ATTR_CLEANING_COUNT: int(self.clean_history.count),
-                    ATTR_CLEANED_TOTAL_AREA: int(self.clean_history.total_area),
-                    ATTR_CLEANING_TOTAL_TIME: int(
-                        self.clean_history.total_duration.total_seconds() / 60
-                    ),
-                    ATTR_MAIN_BRUSH_LEFT: int(
-                        self.consumable_state.main_brush_left.total_seconds() / 3600
-                    ),
-                    ATTR_SIDE_BRUSH_LEFT: int(
-                        self.consumable_state.side_brush_left.total_seconds() / 3600
-                    ),
-                    ATTR_FILTER_LEFT: int(
-                        self.consumable_state.filter_left.total_seconds() / 3600
-                    ),
-                    ATTR_SENSOR_DIRTY_LEFT: int(
-                        self.consumable_state.sensor_dirty_left.total_seconds() / 3600
-                    ),
-                    ATTR_STATUS: str(self.vacuum_state.state),
-                }
-            )
-
-            if self.last_clean:
-                attrs[ATTR_CLEAN_START] = self.last_clean.start
-                attrs[ATTR_CLEAN_STOP] = self.last_clean.end
+        return self._state_attrs
+
+    def _build_device_attrs(self):
+        """Build the attributes from the consumable, history and DND state."""
+        attrs = {
+            ATTR_DO_NOT_DISTURB: STATE_ON if self.dnd_state.enabled else STATE_OFF,
+            ATTR_DO_NOT_DISTURB_START: str(self.dnd_state.start),
+            ATTR_DO_NOT_DISTURB_END: str(self.dnd_state.end),
+            ATTR_CLEANING_COUNT: int(self.clean_history.count),
+            ATTR_CLEANED_TOTAL_AREA: int(self.clean_history.total_area),
+            ATTR_CLEANING_TOTAL_TIME: int(
+                self.clean_history.total_duration.total_seconds() / 60
+            ),
+            ATTR_MAIN_BRUSH_LEFT: int(
+                self.consumable_state.main_brush_left.total_seconds() / 3600
+            ),
+            ATTR_SIDE_BRUSH_LEFT: int(
+                self.consumable_state.side_brush_left.total_seconds() / 3600
+            ),
+            ATTR_FILTER_LEFT: int(
+                self.consumable_state.filter_left.total_seconds() / 3600
+            ),
+            ATTR_SENSOR_DIRTY_LEFT: int(
+                self.consumable_state.sensor_dirty_left.total_seconds() / 3600
+            ),
+        }
 
-            if self.vacuum_state.got_error:
-                attrs[ATTR_ERROR] = self.vacuum_state.error
+        if self.last_clean:
+            attrs[ATTR_CLEAN_START] = self.last_clean.start
+            attrs[ATTR_CLEAN_STOP] = self.last_clean.end
+        return attrs
+
+    def _build_status_attrs(self):
+        """Build the attributes from the vacuum status."""
+        attrs = {
+            # Not working --> 'Cleaning mode':
+            #    STATE_ON if self.vacuum_state.in_cleaning else STATE_OFF,
+            ATTR_CLEANING_TIME: int(self.vacuum_state.clean_time.total_seconds() / 60),
+            ATTR_CLEANED_AREA: int(self.vacuum_state.clean_area),
+            ATTR_STATUS: str(self.vacuum_state.state),
+        }
+
+        if self.vacuum_state.got_error:
+            attrs[ATTR_ERROR] = self.vacuum_state.error
         return attrs
 
     @property
@@ -350,7 +345,10 @@ class MiroboVacuum(StateVacuumDevice):
     async def _try_command(self, mask_error, func, *args, **kwargs):
         """Call a vacuum command handling error messages."""
         try:
-            await self.hass.async_add_executor_job(partial(func, *args, **kwargs))
+            if kwargs:
+                await self.hass.async_add_executor_job(partial(func, *args, **kwargs))
+            else:
+                await self.hass.async_add_executor_job(func, *args)
             return True
         except DeviceException as exc:
             _LOGGER.error(mask_error, exc)
@@ -372,8 +370,9 @@ class MiroboVacuum(StateVacuumDevice):
 
     async def async_set_fan_speed(self, fan_speed, **kwargs):
         """Set fan speed."""
-        if fan_speed.capitalize() in FAN_SPEEDS:
-            fan_speed = FAN_SPEEDS[fan_speed.capitalize()]
+        speed = FAN_SPEED_LOOKUP.get(fan_speed.capitalize())
+        if speed is not None:
+            fan_speed = speed
         else:
             try:
                 fan_speed = int(fan_speed)
@@ -452,12 +451,19 @@ class MiroboVacuum(StateVacuumDevice):
         try:
             state = self._vacuum.status()
             self.vacuum_state = state
+            # Keep the status attributes in line with the state, even if
+            # one of the calls below fails
+            self._status_attrs = self._build_status_attrs()
+            self._state_attrs = {**self._device_attrs, **self._status_attrs}
 
             self.consumable_state = self._vacuum.consumable_status()
             self.clean_history = self._vacuum.clean_history()
             self.last_clean = self._vacuum.last_clean_details()
             self.dnd_state = self._vacuum.dnd_status()
 
+            # Computed once per update instead of on every state write
+            self._device_attrs = self._build_device_attrs()
+            self._state_attrs = {**self._device_attrs, **self._status_attrs}
             self._available = True
         except OSError as exc:
             _LOGGER.error("Got OSError while fetching the state: %s", exc)
@@ -466,8 +472,8 @@ class MiroboVacuum(StateVacuumDevice):
 
     async def async_clean_zone(self, zone, repeats=1):
         """Clean selected area for the number of repeats indicated."""
-        for _zone in zone:
-            _zone.append(repeats)
+        # Build a new list so the caller's zones are left untouched
+        zone = [[*_zone, repeats] for _zone in zone]
         _LOGGER.debug("Zone with repeats: %s", zone)
         try:
             await self.hass.async_add_executor_job(self._vacuum.zoned_clean, zone)
@@ -0,0 +1,411 @@
+"""The tests for the OpenWrt (ubus) device tracker platform."""
+import json as _json
+import os
+from unittest import mock
+
+import pytest
+from yarl import URL
+
+from homeassistant.components.device_tracker import DOMAIN
+from homeassistant.components.device_tracker.legacy import YAML_DEVICES
+from homeassistant.components.ubus.device_tracker import (
+    CONF_DHCP_SOFTWARE,
+    DnsmasqUbusDeviceScanner,
+    OdhcpdUbusDeviceScanner,
+    UbusDeviceScanner,
+    _async_req_json_rpc_batch,
+    async_get_scanner,
+)
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_PASSWORD,
+    CONF_PLATFORM,
+    CONF_USERNAME,
+    EVENT_HOMEASSISTANT_CLOSE,
+    EVENT_HOMEASSISTANT_STOP,
+    STATE_HOME,
+)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.setup import async_setup_component
+
+from tests.common import mock_component
+from tests.test_util.aiohttp import AiohttpClientMockResponse
+
+URL_UBUS = "http://192.168.1.1/ubus"
+CONFIG = {CONF_HOST: "192.168.1.1", CONF_USERNAME: "root", CONF_PASSWORD: "secret"}
+SESSION_ID = "a" * 32
+
+MAC_LAPTOP = "aa:bb:cc:dd:ee:ff"
+MAC_PHONE = "11:22:33:44:55:66"
+LEASES = f"1580000000 {MAC_LAPTOP} 192.168.1.10 laptop 01:{MAC_LAPTOP}\n"
+
+CLIENT_SESSION_PATH = "homeassistant.components.ubus.device_tracker.aiohttp"
+
+
+class FakeRouter:
+    """Answer ubus JSON RPC requests the way uhttpd does."""
+
+    def __init__(self):
+        """Initialize the router with one access point and one client."""
+        self.session_id = SESSION_ID
+        self.logins = 0
+        self.calls = []
+        self.denied = set()
+        self.hostapd = {"hostapd.wlan0": {}}
+        self.clients = {
+            "hostapd.wlan0": {
+                "clients": {
+                    MAC_LAPTOP: {"authorized": True},
+                    "de:ad:be:ef:00:00": {"authorized": False},
+                }
+            }
+        }
+        self.leases = LEASES
+        self.mtime = 1
+
+    def count(self, subsystem, method):
+        """Return how often a ubus method was called."""
+        return self.calls.count((subsystem, method))
+
+    def _reply(self, request):
+        """Answer a single JSON RPC request."""
+        session_id, subsystem, method, params = request["params"]
+        self.calls.append((subsystem, method))
+        reply = {"jsonrpc": "2.0", "id": request["id"]}
+
+        if (subsystem, method) == ("session", "login"):
+            self.logins += 1
+            if self.session_id is None:
+                # UBUS_STATUS_PERMISSION_DENIED, the router refused the login
+                reply["result"] = [6]
+            else:
+                reply["result"] = [0, {"ubus_rpc_session": self.session_id}]
+        elif session_id != self.session_id or (subsystem, method) in self.denied:
+            reply["error"] = {"code": -32002, "message": "Access denied"}
+        elif request["method"] == "list":
+            reply["result"] = self.hostapd
+        else:
+            data = self._call(subsystem, method)
+            reply["result"] = [4] if data is None else [0, data]
+        return reply
+
+    def _call(self, subsystem, method):
+        """Return the data of a ubus call."""
+        if method == "get_clients":
+            return self.clients.get(subsystem)
+        if (subsystem, method) == ("uci", "get"):
+            return {"values": {"cfg01411c": {"leasefile": "/tmp/dhcp.leases"}}}
+        if (subsystem, method) == ("file", "stat"):
+            return {"mtime": self.mtime}
+        if (subsystem, method) == ("file", "read"):
+            return {"data": self.leases}
+        if (subsystem, method) == ("dhcp", "ipv4leases"):
+            return {
+                "device": {
+                    "br-lan": {
+                        "leases": [{"mac": "aabbccddeeff", "hostname": "laptop"}]
+                    }
+                }
+            }
+        return None
+
+    async def match_request(self, method, url, *, json=None, **kwargs):
+        """Answer a request posted to the ubus endpoint."""
+        if isinstance(json, list):
+            response = [self._reply(request) for request in json]
+        else:
+            response = self._reply(json)
+        return AiohttpClientMockResponse(
+            method, URL(url), 200, _json.dumps(response).encode()
+        )
+
+
+def _create_session(hass, aioclient_mock):
+    """Create a mocked aiohttp session closed when Home Assistant stops."""
+    websession = aioclient_mock.create_session(hass.loop)
+
+    async def _async_close_session(event):
+        """Close session."""
+        await websession.close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, _async_close_session)
+    return websession
+
+
+@pytest.fixture
+def router(hass, aioclient_mock):
+    """Return a fake router and an aiohttp session talking to it."""
+    fake_router = FakeRouter()
+    websession = _create_session(hass, aioclient_mock)
+    # Answer depending on the JSON RPC body, not only on the URL
+    object.__setattr__(websession, "_request", fake_router.match_request)
+    fake_router.websession = websession
+    return fake_router
+
+
+@pytest.fixture
+def yaml_devices(hass):
+    """Set up the zone component and remove the known devices file."""
+    mock_component(hass, "zone")
+    yaml_devices = hass.config.path(YAML_DEVICES)
+    yield
+    if os.path.isfile(yaml_devices):
+        os.remove(yaml_devices)
+
+
+@pytest.mark.parametrize(
+    "dhcp_software,scanner_class",
+    [
+        ("dnsmasq", DnsmasqUbusDeviceScanner),
+        ("odhcpd", OdhcpdUbusDeviceScanner),
+        ("none", UbusDeviceScanner),
+    ],
+)
+async def test_get_scanner(hass, router, dhcp_software, scanner_class):
+    """Test the scanner matching the DHCP software is returned."""
+    with mock.patch(CLIENT_SESSION_PATH) as mock_aiohttp:
+        mock_aiohttp.ClientSession.return_value = router.websession
+        scanner = await async_get_scanner(
+            hass, {DOMAIN: {**CONFIG, CONF_DHCP_SOFTWARE: dhcp_software}}
+        )
+
+    assert type(scanner) is scanner_class
+    assert scanner.websession is router.websession
+    assert mock_aiohttp.TCPConnector.call_args == mock.call(
+        limit=4, keepalive_timeout=75
+    )
+    # Logging in is left to the first scan
+    assert router.calls == []
+
+
+async def test_setup_device_tracker(hass, aioclient_mock, yaml_devices):
+    """Test setting up the platform tracks the router clients."""
+    fake_router = FakeRouter()
+    # Only closed by the platform itself
+    websession = aioclient_mock.create_session(hass.loop)
+    object.__setattr__(websession, "_request", fake_router.match_request)
+
+    with mock.patch(
+        f"{CLIENT_SESSION_PATH}.ClientSession", return_value=websession
+    ), mock.patch(f"{CLIENT_SESSION_PATH}.TCPConnector"):
+        assert await async_setup_component(
+            hass, DOMAIN, {DOMAIN: {CONF_PLATFORM: "ubus", **CONFIG}}
+        )
+        await hass.async_block_till_done()
+
+    assert hass.states.get(f"{DOMAIN}.laptop").state == STATE_HOME
+    assert fake_router.logins == 1
+
+    # Scans may still run while stopping, the session is closed afterwards
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+    await hass.async_block_till_done()
+    assert not websession.closed
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_CLOSE)
+    await hass.async_block_till_done()
+    assert websession.closed
+
+
+async def test_batch_reply_matched_by_id(hass, aioclient_mock):
+    """Test batched replies are matched to their call by id."""
+    aioclient_mock.post(
+        URL_UBUS,
+        json=[
+            {"jsonrpc": "2.0", "id": 1, "result": [0, {"clients": {MAC_PHONE: {}}}]},
+            {"jsonrpc": "2.0", "id": 2, "result": [4]},
+            {"jsonrpc": "2.0", "id": 0, "result": [0, {"clients": {MAC_LAPTOP: {}}}]},
+        ],
+    )
+    websession = _create_session(hass, aioclient_mock)
+    calls = [
+        ("hostapd.wlan0", "get_clients", {}),
+        ("hostapd.wlan1", "get_clients", {}),
+        ("hostapd.wlan2", "get_clients", {}),
+    ]
+
+    results = await _async_req_json_rpc_batch(websession, URL_UBUS, SESSION_ID, calls)
+
+    assert results == [
+        {"clients": {MAC_LAPTOP: {}}},
+        {"clients": {MAC_PHONE: {}}},
+        None,
+    ]
+    assert aioclient_mock.call_count == 1
+    body = aioclient_mock.mock_calls[0][2]
+    assert [request["id"] for request in body] == [0, 1, 2]
+    assert body[1]["params"] == [SESSION_ID, "hostapd.wlan1", "get_clients", {}]
+
+
+async def test_batch_bare_object_reply(hass, aioclient_mock):
+    """Test a batch answered with a single object instead of an array."""
+    aioclient_mock.post(
+        URL_UBUS, json={"jsonrpc": "2.0", "id": 0, "result": [0, {"clients": {}}]},
+    )
+    websession = _create_session(hass, aioclient_mock)
+
+    results = await _async_req_json_rpc_batch(
+        websession, URL_UBUS, SESSION_ID, [("hostapd.wlan0", "get_clients", {})]
+    )
+
+    assert results == [{"clients": {}}]
+
+
+async def test_batch_error_reply(hass, aioclient_mock):
+    """Test error replies in a batch raise."""
+    aioclient_mock.post(
+        URL_UBUS,
+        json=[
+            {"jsonrpc": "2.0", "id": 0, "result": [0, {"clients": {}}]},
+            {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "error": {"code": -32002, "message": "Access denied"},
+            },
+        ],
+    )
+    websession = _create_session(hass, aioclient_mock)
+    calls = [("hostapd.wlan0", "get_clients", {}), ("hostapd.wlan1", "get_clients", {})]
+
+    with pytest.raises(PermissionError):
+        await _async_req_json_rpc_batch(websession, URL_UBUS, SESSION_ID, calls)
+
+    aioclient_mock.clear_requests()
+    aioclient_mock.post(
+        URL_UBUS,
+        json=[
+            {
+                "jsonrpc": "2.0",
+                "id": 0,
+                "error": {"code": -32602, "message": "Invalid parameters"},
+            }
+        ],
+    )
+
+    with pytest.raises(HomeAssistantError):
+        await _async_req_json_rpc_batch(websession, URL_UBUS, SESSION_ID, calls)
+
+
+async def test_lazy_first_scan(hass, router):
+    """Test nothing is requested before the first scan."""
+    router.hostapd = {}
+    scanner = UbusDeviceScanner(CONFIG, router.websession)
+    assert router.calls == []
+
+    # hostapd is not running yet, right after the router booted
+    assert await scanner.async_scan_devices() == []
+    assert router.calls == [("session", "login"), ("hostapd.*", "")]
+
+    # Access points are looked up again without logging in again
+    router.hostapd = {"hostapd.wlan0": {}}
+    assert await scanner.async_scan_devices() == [MAC_LAPTOP]
+    assert router.logins == 1
+
+
+async def test_login_failure_logged_once(hass, caplog, router):
+    """Test a router that is down is only reported once."""
+    router.session_id = None
+    scanner = UbusDeviceScanner(CONFIG, router.websession)
+
+    assert await scanner.async_scan_devices() == []
+    assert await scanner.async_scan_devices() == []
+
+    assert router.logins == 2
+    assert caplog.text.count("Unable to log in") == 1
+
+
+async def test_relogin_after_access_denied(hass, caplog, router):
+    """Test the scanner logs in again once the router lost the session."""
+    scanner = DnsmasqUbusDeviceScanner(CONFIG, router.websession)
+    assert await scanner.async_scan_devices() == [MAC_LAPTOP]
+    assert router.logins == 1
+
+    # The router rebooted and forgot our session
+    router.session_id = "b" * 32
+    assert await scanner.async_scan_devices() == [MAC_LAPTOP]
+    assert router.logins == 2
+    assert scanner.session_id == "b" * 32
+    assert "Invalid session detected" in caplog.text
+
+
+async def test_concurrent_relogin_once(hass, router):
+    """Test concurrent requests with an expired session log in only once."""
+    scanner = DnsmasqUbusDeviceScanner(CONFIG, router.websession)
+    scanner.session_id = "expired"
+    scanner.hostapd = ["hostapd.wlan0"]
+
+    # Clients and leases are fetched concurrently on the first scan
+    assert await scanner.async_scan_devices() == [MAC_LAPTOP]
+    assert router.logins == 1
+    assert await scanner.async_get_device_name(MAC_LAPTOP) == "laptop"
+
+
+async def test_dnsmasq_leases_cached_by_mtime(hass, router):
+    """Test the lease file is only read again when it changed."""
+    scanner = DnsmasqUbusDeviceScanner(CONFIG, router.websession)
+    assert await scanner.async_scan_devices() == [MAC_LAPTOP]
+    assert await scanner.async_get_device_name(MAC_LAPTOP) == "laptop"
+    assert router.count("file", "read") == 1
+
+    # No new device, the leases are not looked at
+    await scanner.async_scan_devices()
+    assert router.count("file", "stat") == 1
+
+    # New device but unchanged lease file
+    router.clients["hostapd.wlan0"]["clients"][MAC_PHONE] = {"authorized": True}
+    await scanner.async_scan_devices()
+    assert router.count("file", "stat") == 2
+    assert router.count("file", "read") == 1
+
+    # Another new device and the lease file changed
+    del router.clients["hostapd.wlan0"]["clients"][MAC_PHONE]
+    await scanner.async_scan_devices()
+    router.clients["hostapd.wlan0"]["clients"][MAC_PHONE] = {"authorized": True}
+    router.leases += f"1580000000 {MAC_PHONE} 192.168.1.11 phone *\n"
+    router.mtime = 2
+    await scanner.async_scan_devices()
+    assert router.count("file", "read") == 2
+    assert await scanner.async_get_device_name(MAC_PHONE) == "phone"
+
+
+async def test_dnsmasq_stat_denied(hass, caplog, router):
+    """Test a user not allowed to stat falls back to reading the leases."""
+    router.denied.add(("file", "stat"))
+    scanner = DnsmasqUbusDeviceScanner(CONFIG, router.websession)
+
+    assert await scanner.async_scan_devices() == [MAC_LAPTOP]
+    assert await scanner.async_get_device_name(MAC_LAPTOP) == "laptop"
+    assert not scanner.leasefile_stat
+    assert router.logins == 1
+    assert "Invalid session detected" not in caplog.text
+
+    router.clients["hostapd.wlan0"]["clients"][MAC_PHONE] = {"authorized": True}
+    await scanner.async_scan_devices()
+    assert router.count("file", "stat") == 1
+    assert router.count("file", "read") == 2
+
+
+async def test_dnsmasq_malformed_lease_line(hass, router):
+    """Test malformed lease lines are skipped."""
+    router.leases = f"garbage\n{LEASES}"
+    scanner = DnsmasqUbusDeviceScanner(CONFIG, router.websession)
+
+    assert await scanner.async_scan_devices() == [MAC_LAPTOP]
+    assert await scanner.async_get_device_name(MAC_LAPTOP) == "laptop"
+
+
+async def test_lease_error_keeps_clients(hass, caplog, router):
+    """Test a failing lease fetch still reports the clients."""
+    router.denied.update({("file", "stat"), ("file", "read")})
+    scanner = DnsmasqUbusDeviceScanner(CONFIG, router.websession)
+
+    assert await scanner.async_scan_devices() == [MAC_LAPTOP]
+    assert await scanner.async_get_device_name(MAC_LAPTOP) is None
+    assert "Unable to fetch the DHCP leases" in caplog.text
+
+
+async def test_odhcpd_mac_formatting(hass, router):
+    """Test odhcpd MAC addresses are converted to the colon format."""
+    scanner = OdhcpdUbusDeviceScanner(CONFIG, router.websession)
+
+    assert await scanner.async_scan_devices() == [MAC_LAPTOP]
+    assert await scanner.async_get_device_name(MAC_LAPTOP) == "laptop"
+    assert scanner.mac2name == {MAC_LAPTOP.upper(): "laptop"}
@@ -2,6 +2,7 @@
 from datetime import time, timedelta
 from unittest import mock
 
+from miio import DeviceException
 import pytest
 
 from homeassistant.components.vacuum import (
@@ -32,9 +33,11 @@ from homeassistant.components.xiaomi_miio.vacuum import (
     ATTR_FILTER_LEFT,
     ATTR_MAIN_BRUSH_LEFT,
     ATTR_SIDE_BRUSH_LEFT,
+    ATTR_STATUS,
     CONF_HOST,
     CONF_NAME,
     CONF_TOKEN,
+    DATA_KEY,
     DOMAIN as XIAOMI_DOMAIN,
     SERVICE_CLEAN_ZONE,
     SERVICE_MOVE_REMOTE_CONTROL,
@@ -171,6 +174,51 @@ async def test_xiaomi_exceptions(hass, caplog, mock_mirobo_errors):
     assert "Got OSError while fetching the state" in caplog.text
 
 
+async def test_xiaomi_status_attributes_on_partial_update(
+    hass, caplog, mock_mirobo_is_on
+):
+    """Test the status attributes follow the state if a later call fails."""
+    entity_name = "test_vacuum_cleaner_partial"
+    entity_id = f"{DOMAIN}.{entity_name}"
+
+    await async_setup_component(
+        hass,
+        DOMAIN,
+        {
+            DOMAIN: {
+                CONF_PLATFORM: PLATFORM,
+                CONF_HOST: "192.168.1.100",
+                CONF_NAME: entity_name,
+                CONF_TOKEN: "12345678901234567890123456789012",
+            }
+        },
+    )
+    await hass.async_block_till_done()
+
+    state = hass.states.get(entity_id)
+    assert state.state == STATE_CLEANING
+    assert state.attributes.get(ATTR_STATUS) == "Test Xiaomi Cleaning"
+    assert state.attributes.get(ATTR_ERROR) is None
+
+    mock_mirobo_is_on.status().got_error = True
+    mock_mirobo_is_on.status().error = "Error message"
+    mock_mirobo_is_on.status().state = "Test Xiaomi Error"
+    mock_mirobo_is_on.status().clean_area = 12.3
+    mock_mirobo_is_on.consumable_status.side_effect = DeviceException("timeout")
+
+    await hass.helpers.entity_component.async_update_entity(entity_id)
+
+    assert "Got exception while fetching the state" in caplog.text
+    state = hass.states.get(entity_id)
+    assert state.state == STATE_ERROR
+    assert state.attributes.get(ATTR_STATUS) == "Test Xiaomi Error"
+    assert state.attributes.get(ATTR_ERROR) == "Error message"
+    assert state.attributes.get(ATTR_CLEANED_AREA) == 12
+    # The attributes of the failed calls keep their previous values
+    assert state.attributes.get(ATTR_MAIN_BRUSH_LEFT) == 11
+    assert state.attributes.get(ATTR_CLEANING_COUNT) == 41
+
+
 async def test_xiaomi_vacuum_services(hass, caplog, mock_mirobo_is_got_error):
     """Test vacuum supported features."""
     entity_name = "test_vacuum_cleaner_1"
@@ -409,3 +457,97 @@ async def test_xiaomi_specific_services(hass, caplog, mock_mirobo_is_on):
     )
     mock_mirobo_is_on.assert_has_calls(STATUS_CALLS, any_order=True)
     mock_mirobo_is_on.reset_mock()
+
+
+async def test_xiaomi_clean_zone(hass, mock_mirobo_is_on):
+    """Test the zones are sent with their repeats and left unchanged."""
+    entity_name = "test_vacuum_cleaner_zone"
+    entity_id = f"{DOMAIN}.{entity_name}"
+
+    await async_setup_component(
+        hass,
+        DOMAIN,
+        {
+            DOMAIN: {
+                CONF_PLATFORM: PLATFORM,
+                CONF_HOST: "192.168.1.100",
+                CONF_NAME: entity_name,
+                CONF_TOKEN: "12345678901234567890123456789012",
+            }
+        },
+    )
+    await hass.async_block_till_done()
+
+    zone = [[25500, 25500, 25600, 25600], [26000, 26000, 26500, 26500]]
+    control = {ATTR_ENTITY_ID: entity_id, "zone": zone, "repeats": 2}
+    for _ in range(2):
+        await hass.services.async_call(
+            XIAOMI_DOMAIN, SERVICE_CLEAN_ZONE, control, blocking=True
+        )
+
+    expected = mock.call(
+        [[25500, 25500, 25600, 25600, 2], [26000, 26000, 26500, 26500, 2]]
+    )
+    assert mock_mirobo_is_on.zoned_clean.call_args_list == [expected, expected]
+    mock_mirobo_is_on.zoned_clean.reset_mock()
+
+    # The service schema copies the zones, call the entity with the same list
+    mirobo = hass.data[DATA_KEY]["192.168.1.100"]
+    for _ in range(2):
+        await mirobo.async_clean_zone(zone, repeats=3)
+
+    assert zone == [[25500, 25500, 25600, 25600], [26000, 26000, 26500, 26500]]
+    expected = mock.call(
+        [[25500, 25500, 25600, 25600, 3], [26000, 26000, 26500, 26500, 3]]
+    )
+    assert mock_mirobo_is_on.zoned_clean.call_args_list == [expected, expected]
+
+
+async def test_xiaomi_service_multiple_vacuums(hass):
+    """Test one service call sends the command to every targeted vacuum."""
+    mock_vacuums = {}
+    for host in ("192.168.1.100", "192.168.1.101"):
+        mock_vacuum = mock.MagicMock()
+        mock_vacuum.status().got_error = False
+        mock_vacuum.status().state_code = 5
+        mock_vacuums[host] = mock_vacuum
+
+    with mock.patch(
+        "homeassistant.components.xiaomi_miio.vacuum.Vacuum",
+        side_effect=lambda host, token: mock_vacuums[host],
+    ):
+        await async_setup_component(
+            hass,
+            DOMAIN,
+            {
+                DOMAIN: [
+                    {
+                        CONF_PLATFORM: PLATFORM,
+                        CONF_HOST: host,
+                        CONF_NAME: f"test_vacuum_cleaner_{idx}",
+                        CONF_TOKEN: "12345678901234567890123456789012",
+                    }
+                    for idx, host in enumerate(mock_vacuums)
+                ]
+            },
+        )
+        await hass.async_block_till_done()
+
+    for mock_vacuum in mock_vacuums.values():
+        mock_vacuum.reset_mock()
+
+    await hass.services.async_call(
+        XIAOMI_DOMAIN,
+        SERVICE_START_REMOTE_CONTROL,
+        {
+            ATTR_ENTITY_ID: [
+                f"{DOMAIN}.test_vacuum_cleaner_0",
+                f"{DOMAIN}.test_vacuum_cleaner_1",
+            ]
+        },
+        blocking=True,
+    )
+
+    for mock_vacuum in mock_vacuums.values():
+        mock_vacuum.manual_start.assert_called_once_with()
+        mock_vacuum.assert_has_calls(STATUS_CALLS, any_order=True)